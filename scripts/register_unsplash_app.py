@@ -1,162 +1,667 @@
 import asyncio
+import json
+import atexit
+import logging
+import logging.handlers
+import queue
 import sys
 import os
 import random
 import re
-from datetime import datetime
-from playwright.async_api import async_playwright
 
-async def register_unsplash_app(app_name: str, headless: bool = False) -> str | None:
+_log = logging.getLogger("unsplash.reg")
+_log_listener = None
+
+def _setup_logging() -> None:
+    # 并发注册时各协程的输出经队列交给单独线程写出，不在事件循环里争 stdout 锁。
+    # 只由命令行入口和批量/登录入口调用（可重复调用）；被当作模块导入时不起线程，日志交给宿主的 logging 配置
+    global _log_listener
+    if _log_listener is not None or _log.handlers:
+        return
+    q = queue.SimpleQueue()
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    _log_listener = logging.handlers.QueueListener(q, handler)
+    _log_listener.start()
+    atexit.register(_log_listener.stop)
+    _log.addHandler(logging.handlers.QueueHandler(q))
+    try:
+        _log.setLevel((os.getenv("UNSPLASH_REG_LOG_LEVEL") or "INFO").strip().upper())
+    except ValueError:
+        _log.setLevel(logging.INFO)
+    _log.propagate = False
+
+def _print_result(line: str) -> None:
+    # 与进度日志同走队列，保证输出顺序；直接交给 handler，不受 UNSPLASH_REG_LOG_LEVEL 影响
+    _log.handle(_log.makeRecord(_log.name, logging.INFO, __file__, 0, line, None, None))
+
+_RE_NEW_APP = re.compile(r"New Application", re.I)
+_RE_ACCEPT = re.compile(r"Accept terms", re.I)
+_RE_NAME = re.compile(r"Application name", re.I)
+_RE_DESC = re.compile(r"Description", re.I)
+_RE_CREATE = re.compile(r"Create application", re.I)
+
+# One CDP round-trip instead of a locator.count() per question.
+_PROBE_STATE_JS = """() => {
+    const named = (sel, re) => Array.from(document.querySelectorAll(sel)).some(
+        (el) => re.test(((el.getAttribute('aria-label') || '') + ' ' + (el.textContent || '')).trim())
+    );
+    return {
+        url: location.href,
+        hasLoginLink: named('a', /Log in|Login/i),
+        hasNewAppLink: named('a', /New Application/i),
+        hasCheckbox: !!document.querySelector('input[type="checkbox"], [role="checkbox"]'),
+        hasAcceptBtn: named('button, [role="button"], input[type="submit"]', /Accept terms/i),
+        termsAccepted: (() => { try { return !!localStorage.getItem('unsplash_terms_accepted_local'); } catch (e) { return false; } })(),
+    };
+}"""
+
+_EXTRACT_KEY_JS = """() => {
+    // 优先取 ID 匹配的
+    const el = document.querySelector('#access_key');
+    if (el && el.value && el.value.length > 20 && el.value !== '✓') return el.value;
+
+    // 其次取所有只读输入框中看起来像 Key 的
+    const inputs = Array.from(document.querySelectorAll('input[readonly]'));
+    for (const i of inputs) {
+        const v = i.value.trim();
+        if (v.length > 20 && !v.includes(' ') && v !== '✓') return v;
+    }
+    return null;
+}"""
+
+# 文档可交互，且（按需）应用名输入框已可见；一次 JS 轮询代替 load_state + locator.wait_for 的多次往返
+_READY_JS = """(needForm) => {
+    if (document.readyState === 'loading') return false;
+    if (!needForm) return true;
+    return Array.from(document.querySelectorAll('input, textarea')).some((el) => {
+        const label = Array.from(el.labels || []).map((l) => l.textContent || '').join(' ')
+            + ' ' + (el.getAttribute('aria-label') || '') + ' ' + (el.getAttribute('placeholder') || '') + ' ' + (el.getAttribute('title') || '');
+        const named = /Application name/i.test(label) || /application\]?\[name\]|application_name/i.test(el.name || '');
+        return named && el.getClientRects().length > 0;
+    });
+}"""
+
+# 勾选全部条款复选框（含 role=checkbox 的自定义控件）并回报按钮状态，一次往返完成整个条款块
+_ACCEPT_TERMS_JS = """() => {
+    const cbs = Array.from(document.querySelectorAll('input[type="checkbox"]'));
+    cbs.forEach((cb) => {
+        if (!cb.checked) {
+            cb.click();
+            cb.dispatchEvent(new Event('change', { bubbles: true }));
+        }
+    });
+    const roles = Array.from(document.querySelectorAll('[role="checkbox"]'));
+    roles.forEach((cb) => { if (cb.getAttribute('aria-checked') !== 'true') cb.click(); });
+    const btn = Array.from(document.querySelectorAll('button, [role="button"], input[type="submit"]')).find(
+        (el) => /Accept terms/i.test(((el.getAttribute('aria-label') || '') + ' ' + (el.textContent || '') + ' ' + (el.value || '')).trim())
+    );
+    return {
+        n: cbs.length + roles.length,
+        allChecked: cbs.every((cb) => cb.checked) && roles.every((cb) => cb.getAttribute('aria-checked') === 'true'),
+        btnEnabled: !btn || !(btn.disabled || btn.getAttribute('aria-disabled') === 'true'),
+    };
+}"""
+
+# 按钮存在、可见且未禁用；三个条件在一个轮询函数里判断，不再先取 element_handle 再等
+_BUTTON_READY_JS = """(src) => {
+    const re = new RegExp(src, 'i');
+    return Array.from(document.querySelectorAll('button, [role="button"], input[type="submit"]')).some((el) => {
+        const label = ((el.getAttribute('aria-label') || '') + ' ' + (el.textContent || '') + ' ' + (el.value || '')).trim();
+        return re.test(label)
+            && !el.disabled
+            && el.getAttribute('aria-disabled') !== 'true'
+            && el.getClientRects().length > 0;
+    });
+}"""
+
+async def _wait_button(page, pattern, timeout: int = 10000) -> bool:
+    try:
+        await page.wait_for_function(_BUTTON_READY_JS, arg=pattern.pattern, polling=100, timeout=timeout)
+        return True
+    except Exception:
+        return False
+
+async def _wait_ready(page, timeout: int = 10000, interval: int = 100, form: bool = False) -> bool:
+    try:
+        await page.wait_for_function(_READY_JS, arg=bool(form), polling=interval, timeout=timeout)
+        return True
+    except Exception:
+        return False
+
+# 流程只操作表单，图片/字体/媒体与统计脚本都用不到，直接拦掉以减少下载和解析
+# 只让这些 URL 经过 Python 路由，其余请求不进 route 回调，照常走浏览器网络栈
+_BLOCKED_URL_RE = re.compile(
+    r"^[a-z]+://(?:[^/?#]*\.)?(?:google-analytics\.com|googletagmanager\.com|segment\.io|segment\.com"
+    r"|doubleclick\.net|hotjar\.com|images\.unsplash\.com|plus\.unsplash\.com)(?::\d+)?/"
+    r"|^[^?#]*\.(?:png|jpe?g|gif|webp|avif|svg|ico|bmp|woff2?|ttf|otf|eot|mp4|webm|mp3|m4a|ogg|wav)(?:[?#]|$)",
+    re.I,
+)
+
+async def _route_filter(route):
+    try:
+        await route.abort()
+    except Exception:
+        pass
+
+async def _install_route_filter(page) -> None:
+    # 挂在页面而不是上下文上，避免影响共享浏览器里的其他页面
+    try:
+        await page.route(_BLOCKED_URL_RE, _route_filter)
+    except Exception:
+        pass
+
+_VIEWPORT = {'width': 1366, 'height': 768}
+_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+def _session_dir() -> str:
+    # UNSPLASH_PROFILE_DIR 可指向 tmpfs（如 /dev/shm/.unsplash_session），CI 里会话文件不落盘
+    return (
+        os.getenv("UNSPLASH_PROFILE_DIR")
+        or os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".session")
+    )
+
+def _storage_state_path() -> str:
+    return os.getenv("UNSPLASH_STORAGE_STATE") or os.path.join(_session_dir(), "unsplash.json")
+
+def _legacy_profile_dir() -> str:
+    # 旧版本用 launch_persistent_context 保存整个 Chromium profile
+    return os.getenv("UNSPLASH_USER_DATA_DIR") or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "..", ".session", "unsplash"
+    )
+
+async def _migrate_legacy_profile(p) -> None:
     """
-    Registers a new Unsplash app and returns the Access Key.
+    One-time migration: exports the login of an old persistent profile to the storage_state JSON.
     """
-    async with async_playwright() as p:
-        user_data_dir = (
-            os.getenv("UNSPLASH_USER_DATA_DIR")
-            or os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".session", "unsplash")
+    state_path = _storage_state_path()
+    legacy_dir = _legacy_profile_dir()
+    if os.path.isfile(state_path):
+        if os.getenv("UNSPLASH_USER_DATA_DIR"):
+            _log.warning(f"UNSPLASH_USER_DATA_DIR 已不再使用，登录态读取自 {state_path}")
+        return
+    try:
+        if not (os.path.isdir(legacy_dir) and os.listdir(legacy_dir)):
+            return
+    except OSError:
+        return
+    _log.warning(f"发现旧版浏览器 profile {legacy_dir}，正在把登录态迁移到 {state_path} ...")
+    try:
+        context = await p.chromium.launch_persistent_context(legacy_dir, headless=True)
+        try:
+            await _save_storage_state(context)
+        finally:
+            await context.close()
+    except Exception as e:
+        _log.warning(f"迁移旧 profile 失败（可能正被其他浏览器占用）: {e}。请运行 python scripts/register_unsplash_app.py --login 重新登录")
+
+async def _new_context(browser):
+    # 增加更多真实的浏览器参数，减少被判定为机器人的概率
+    state_path = _storage_state_path()
+    return await browser.new_context(
+        storage_state=state_path if os.path.isfile(state_path) else None,
+        viewport=_VIEWPORT,
+        user_agent=_USER_AGENT,
+        ignore_https_errors=True,
+    )
+
+async def _save_storage_state(context) -> None:
+    state_path = _storage_state_path()
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(state_path)), exist_ok=True)
+        state = await context.storage_state()
+        # register_many 的多个上下文可能同时保存：先写临时文件再原子替换，读者不会看到写了一半的 JSON
+        tmp_path = f"{state_path}.{os.getpid()}.{id(context)}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, state_path)
+        _log.info(f"登录态已保存到 {state_path}")
+    except Exception as e:
+        _log.warning(f"保存登录态失败: {e}")
+
+_KEY_LOG_PATH = "unsplash_keys_log.txt"
+
+def _log_key(line: str) -> None:
+    # 这是新 Key 的唯一落盘记录：每次注册都打开-追加-关闭，进程崩溃或被 kill 也不会丢
+    with open(_KEY_LOG_PATH, "a", encoding="utf-8") as f:
+        f.write(line)
+
+_APP_DESCRIPTION = "Dataset pipeline coordination for sharp-ply-share project."
+_RE_APP_PAGE = re.compile(r"/oauth/applications/\d+")
+
+_RE_KEY_INPUT = re.compile(r'<input\b[^>]*\bid="(?:access_key|doorkeeper_application_uid)"[^>]*>', re.I)
+_RE_VALUE_ATTR = re.compile(r'\bvalue="([A-Za-z0-9_\-]{20,})"')
+
+def _parse_access_key(html: str) -> str | None:
+    for m in _RE_KEY_INPUT.finditer(html or ""):
+        v = _RE_VALUE_ATTR.search(m.group(0))
+        if v:
+            return v.group(1)
+    return None
+
+_CSRF_JS = """() => {
+    const meta = document.querySelector('meta[name="csrf-token"]');
+    if (meta && meta.content) return meta.content;
+    const input = document.querySelector('input[name="authenticity_token"]');
+    return input ? input.value : null;
+}"""
+
+# _create_via_post 的三种结果
+_POST_CREATED = "created"   # 已停在新应用的详情页
+_POST_FALLBACK = "fallback" # 确定没有创建任何应用，可以改走页面操作
+_POST_FAILED = "failed"     # 可能已创建但找不到，本次注册失败（不能再走页面操作，否则会重复创建）
+
+_RE_FORM_ERROR = re.compile(
+    r'class="[^"]*\b(?:field_with_errors|error_explanation|alert-danger|form-error)\b'
+    r"|prohibited this|can(?:'|&#39;)t be blank|has already been taken",
+    re.I,
+)
+
+_FIND_APP_JS = """(name) => {
+    for (const a of document.querySelectorAll('a[href*="/oauth/applications/"]')) {
+        if (/\\/oauth\\/applications\\/\\d+/.test(a.getAttribute('href') || '')
+                && (a.textContent || '').trim() === name) return a.href;
+    }
+    return null;
+}"""
+
+async def _create_via_post(page, app_name: str) -> str:
+    """
+    Submits the new-application form directly with the context's cookies.
+
+    Returns _POST_CREATED once the page sits on the app's detail page, _POST_FALLBACK when
+    nothing can have been created (no CSRF token, or the form came back with a validation
+    error), and _POST_FAILED otherwise.
+    """
+    try:
+        token = await page.evaluate(_CSRF_JS)
+    except Exception:
+        token = None
+    if not token:
+        return _POST_FALLBACK
+    resp = None
+    try:
+        # 字段名按 Rails/Doorkeeper 的默认表单推断（doorkeeper_application[...]），并非抓包所得
+        resp = await page.context.request.post(
+            "https://unsplash.com/oauth/applications",
+            form={
+                "authenticity_token": token,
+                "doorkeeper_application[name]": app_name,
+                "doorkeeper_application[description]": _APP_DESCRIPTION,
+            },
+            headers={"X-CSRF-Token": token},
         )
+    except Exception as e:
+        _log.warning(f"表单 POST 失败: {e}")
+    if resp is not None:
+        if resp.ok and _RE_APP_PAGE.search(resp.url or ""):
+            _log.info("已通过表单 POST 创建应用，打开详情页...")
+            await page.goto(resp.url, wait_until="domcontentloaded")
+            return _POST_CREATED
+        if (resp.url or "").split("?", 1)[0].rstrip("/").endswith("/oauth/applications/new"):
+            try:
+                body = await resp.text()
+            except Exception:
+                body = ""
+            if _RE_FORM_ERROR.search(body):
+                # 表单校验失败回到了 /new：应用肯定没有创建，可以安全地改走页面操作
+                _log.warning("表单 POST 被校验拒绝，改用页面操作...")
+                return _POST_FALLBACK
+        _log.warning(f"表单 POST 未跳转到应用详情页 (status={resp.status})，在应用列表中查找...")
+
+    # 结果不明（请求异常、非 2xx 或跳到别处）：应用可能已经建好，先去列表里找同名应用
+    try:
+        await page.goto("https://unsplash.com/oauth/applications", wait_until="domcontentloaded")
+        href = await page.evaluate(_FIND_APP_JS, app_name)
+    except Exception as e:
+        _log.warning(f"打开应用列表失败: {e}")
+        href = None
+    if not href:
+        _log.warning(f"应用列表中没有找到 {app_name}，本次注册失败")
+        return _POST_FAILED
+    _log.info(f"在应用列表中找到 {app_name}，打开详情页...")
+    await page.goto(href, wait_until="domcontentloaded")
+    return _POST_CREATED
+
+async def _dump_page(page, prefix: str) -> None:
+    # 现场 HTML 含 CSRF token、账号信息和 Key，和登录态放在同一个不入库的会话目录里
+    base = os.path.join(_session_dir(), prefix)
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(base)), exist_ok=True)
+    except OSError as e:
+        _log.warning(f"无法创建目录保存出错现场: {e}")
+        return
+    # 截图（渲染线程）与序列化 DOM（主线程）并发进行，出错现场保存耗时约减半
+    shot, html = await asyncio.gather(
+        page.screenshot(path=f"{base}.png"),
+        page.content(),
+        return_exceptions=True,
+    )
+    if isinstance(shot, Exception):
+        _log.warning(f"保存截图失败: {shot}")
+    if isinstance(html, str):
+        try:
+            with open(f"{base}.html", "w", encoding="utf-8") as f:
+                f.write(html)
+        except OSError as e:
+            _log.warning(f"保存页面 HTML 失败: {e}")
+            return
+    else:
+        _log.warning(f"读取页面 HTML 失败: {html}")
+        return
+    _log.warning(f"出错现场已保存到 {base}.png / .html")
+
+async def _probe_state(page) -> dict:
+    try:
+        return await page.evaluate(_PROBE_STATE_JS) or {}
+    except Exception:
+        # 页面正在跳转时 evaluate 可能失败，按"什么都没探测到"处理
+        return {}
+
+async def _register_in_context(
+    context, app_name: str, headless: bool = False, login_timeout_s: int = 300, save_state: bool = True
+) -> str | None:
+    """
+    Runs the registration flow in its own page of ``context``; the page is closed on return.
+
+    save_state writes the context's refreshed session back to the storage_state JSON after a
+    successful registration; pass False for contexts the script doesn't own (a shared CDP browser).
+    """
+    page = await context.new_page()
+    try:
+        return await _register_on_page(page, app_name, headless, login_timeout_s, save_state)
+    finally:
         try:
-            os.makedirs(user_data_dir, exist_ok=True)
+            await page.close()
         except Exception:
             pass
-            
-        try:
-            # 增加更多真实的浏览器启动参数，减少被判定为机器人的概率
-            context = await p.chromium.launch_persistent_context(
-                user_data_dir, 
-                headless=headless,
-                viewport={'width': 1366, 'height': 768},
-                user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-                ignore_https_errors=True
-            )
-        except Exception as e:
-            print(f"无法启动 Chrome/Chromium: {e}. 尝试标准模式...")
-            browser = await p.chromium.launch(headless=headless)
-            context = await browser.new_context(viewport={'width': 1366, 'height': 768})
 
-        page = await context.new_page()
-        # 设置全局超时
-        page.set_default_timeout(45000)
+async def _register_on_page(
+    page, app_name: str, headless: bool, login_timeout_s: int, save_state: bool = True
+) -> str | None:
+    from datetime import datetime
 
-        try:
-            print("正在访问 Unsplash 开发者中心...")
-            # 进一步降低对网络加载的敏感度
-            await page.goto("https://unsplash.com/oauth/applications", wait_until="commit", timeout=60000)
-            await asyncio.sleep(2)
-            
-            # 登录检测：如果 URL 包含 login 或者有 Log in 链接
-            login_link = page.get_by_role("link", name=re.compile(r"Log in|Login", re.I))
-            if "login" in page.url or await login_link.count() > 0:
-                if headless:
-                    print("错误: 需要登录。请先手动运行一次脚本进行登录：python scripts/register_unsplash_app.py")
-                    await context.close()
-                    return None
-                print("检测到未登录，请在浏览器中完成登录并回到应用管理页面...")
-                # 阻塞直到跳转回 applications
-                await page.wait_for_url("**/oauth/applications", timeout=300000)
-                await asyncio.sleep(2)
-
-            # 步骤 1: 检查是否能直接创建，或者需要点击按钮
-            print("正在准备创建应用...")
-            
-            # 这种情况下通常是由于已经通过条款直接跳转到创建页，或者在列表页
-            if "/oauth/applications/new" in page.url:
-                pass
+    # 无头模式下不会有交互登录，可以从第一次导航起就拦截资源；有头模式要等确认已登录后再装，
+    # 否则登录页（验证码/人机校验）的图片、字体会被拦掉
+    if headless:
+        await _install_route_filter(page)
+
+    # 设置全局超时
+    page.set_default_timeout(45000)
+
+    try:
+        _log.info("正在访问 Unsplash 开发者中心...")
+        # 进一步降低对网络加载的敏感度
+        await page.goto("https://unsplash.com/oauth/applications", wait_until="commit", timeout=60000)
+        await _wait_ready(page)
+
+        state = await _probe_state(page)
+
+        # 登录检测：如果 URL 包含 login 或者有 Log in 链接
+        if "login" in str(state.get("url") or page.url) or state.get("hasLoginLink"):
+            if headless:
+                _log.warning("错误: 需要登录。请先手动运行一次脚本进行登录：python scripts/register_unsplash_app.py --login")
+                return None
+            _log.warning(f"检测到未登录，请在 {login_timeout_s}s 内于浏览器中完成登录并回到应用管理页面...")
+            # 阻塞直到跳转回 applications；超时即放弃本次注册，避免一个失效会话拖住整批任务
+            try:
+                await page.wait_for_url("**/oauth/applications", timeout=int(login_timeout_s) * 1000)
+            except Exception:
+                _log.warning(f"登录等待超时 ({login_timeout_s}s)，本次注册放弃，可稍后重试")
+                return None
+            await _save_storage_state(page.context)
+            await _wait_ready(page)
+            state = await _probe_state(page)
+
+        if not headless:
+            await _install_route_filter(page)
+
+        # 步骤 1: 检查是否能直接创建，或者需要点击按钮
+        _log.info("正在准备创建应用...")
+
+        # 这种情况下通常是由于已经通过条款直接跳转到创建页，或者在列表页
+        if "/oauth/applications/new" in str(state.get("url") or page.url):
+            pass
+        else:
+            # 尝试点击按钮
+            if state.get("hasNewAppLink"):
+                await page.get_by_role("link", name=_RE_NEW_APP).first.click()
+                await _wait_ready(page)
             else:
-                # 尝试点击按钮
-                new_app_btn = page.get_by_role("link", name=re.compile(r"New Application", re.I))
-                if await new_app_btn.count() > 0:
-                    await new_app_btn.first.click()
-                else:
-                    await page.goto("https://unsplash.com/oauth/applications/new", wait_until="domcontentloaded")
-
-            # 步骤 2: 处理条款页
-            # 如果出现复选框，说明在条款页
-            if await page.get_by_role("checkbox").count() > 0:
-                print("正在接受条款...")
-                await page.evaluate("""() => {
-                    document.querySelectorAll('input[type="checkbox"]').forEach(cb => {
-                        if (!cb.checked) {
-                            cb.click();
-                            cb.dispatchEvent(new Event('change', { bubbles: true }));
-                        }
-                    });
-                }""")
-                
-                accept_btn = page.get_by_role("button", name=re.compile(r"Accept terms", re.I))
-                if await accept_btn.count() > 0:
-                    await accept_btn.first.click()
-                    # 关键：等待 Modal 弹出或页面内容切换，不需要网络空闲，因为 Unsplash 用的是局部渲染
-                    await asyncio.sleep(3)
+                await page.goto("https://unsplash.com/oauth/applications/new", wait_until="domcontentloaded")
+            state = await _probe_state(page)
+
+        # 步骤 2: 处理条款页
+        # 如果出现复选框，说明在条款页；之前已接受过（localStorage 标记，随 storage_state 保存）且没有
+        # Accept 按钮时直接跳过，避免误勾表单里的其他复选框
+        if state.get("hasCheckbox") and not (state.get("termsAccepted") and not state.get("hasAcceptBtn")):
+            _log.info("正在接受条款...")
+            terms = await page.evaluate(_ACCEPT_TERMS_JS) or {}
+            _log.info(f"条款复选框: {terms.get('n', 0)} 个, 全部勾选={terms.get('allChecked')}")
 
+            # 勾选后按钮可能异步解除禁用，轮询到可点再点
+            if state.get("hasAcceptBtn") and (terms.get("btnEnabled") or await _wait_button(page, _RE_ACCEPT, timeout=5000)):
+                await page.get_by_role("button", name=_RE_ACCEPT).first.click()
+                # 关键：等待 Modal 弹出或页面内容切换，不需要网络空闲，因为 Unsplash 用的是局部渲染
+                # （由下面对应用名输入框的 visible 等待来完成，不再固定 sleep）
+                try:
+                    await page.evaluate("() => localStorage.setItem('unsplash_terms_accepted_local', '1')")
+                    await _save_storage_state(page.context)
+                except Exception:
+                    pass
+
+        # 步骤 3/4: 已登录时直接提交表单 POST，省去渲染表单和模拟输入；只有确定没建出应用时才再走 DOM 流程
+        posted = await _create_via_post(page, app_name)
+        if posted == _POST_FAILED:
+            await _dump_page(page, "reg_error_post")
+            return None
+        if posted == _POST_FALLBACK:
             # 步骤 3: 填写应用信息
-            print("填写应用信息...")
+            _log.info("填写应用信息...")
             # 显式寻找输入框，即使在 Modal 中 get_by_role 也是有效的
-            name_input = page.get_by_role("textbox", name=re.compile(r"Application name", re.I))
-            desc_input = page.get_by_role("textbox", name=re.compile(r"Description", re.I))
-            
+            name_input = page.get_by_role("textbox", name=_RE_NAME)
+            desc_input = page.get_by_role("textbox", name=_RE_DESC)
+
             # 如果没找到，可能是页面还没渲染完或结构又跳了，强制进入 /new 确保万无一失
-            try:
-                await name_input.wait_for(state="visible", timeout=10000)
-            except Exception:
-                print("未发现输入框，尝试强制重定向到新建应用表单...")
+            if not await _wait_ready(page, timeout=15000, form=True):
+                _log.warning("未发现输入框，尝试强制重定向到新建应用表单...")
                 await page.goto("https://unsplash.com/oauth/applications/new", wait_until="domcontentloaded")
                 await name_input.wait_for(state="visible", timeout=10000)
 
             await name_input.fill(app_name)
-            await desc_input.fill("Dataset pipeline coordination for sharp-ply-share project.")
-            
+            await desc_input.fill(_APP_DESCRIPTION)
+
             # 步骤 4: 提交创建
-            print("提交创建并等待详情页...")
-            create_btn = page.get_by_role("button", name=re.compile(r"Create application", re.I))
+            _log.info("提交创建并等待详情页...")
+            create_btn = page.get_by_role("button", name=_RE_CREATE)
+            if not await _wait_button(page, _RE_CREATE):
+                _log.warning("创建按钮尚未可用，仍尝试点击...")
             # 提交后可能需要较长时间处理
             await create_btn.click()
 
-            # 步骤 5: 获取 Access Key (最稳健的解析方式)
-            print("正在提取 Access Key...")
-            # 创建成功后会跳转，或者 Modal 切换。我们等待 access_key 元素出现
-            key_selector = "#access_key"
+        # 步骤 5: 获取 Access Key (最稳健的解析方式)
+        _log.info("正在提取 Access Key...")
+        # 创建成功后会跳转，或者 Modal 切换。轮询直到 Key 出现在 DOM 中（已存在时立即返回）
+        access_key = None
+        if _RE_APP_PAGE.search(page.url or ""):
+            # 已在详情页（表单 POST 路径）：Key 在服务端渲染的 HTML 里，读一次即可，不必轮询 DOM
             try:
-                await page.wait_for_selector(key_selector, state="attached", timeout=30000)
+                access_key = _parse_access_key(await page.content())
             except Exception:
-                print("未检测到标准 Access Key 元素，尝试全文正则提取...")
-
-            # 解析逻辑
-            access_key = await page.evaluate("""() => {
-                // 优先取 ID 匹配的
-                const el = document.querySelector('#access_key');
-                if (el && el.value && el.value.length > 20 && el.value !== '✓') return el.value;
-                
-                // 其次取所有只读输入框中看起来像 Key 的
-                const inputs = Array.from(document.querySelectorAll('input[readonly]'));
-                for (const i of inputs) {
-                    const v = i.value.trim();
-                    if (v.length > 20 && !v.includes(' ') && v !== '✓') return v;
-                }
-                return null;
-            }""")
-
-            if access_key:
-                print(f"应用注册成功！Key: {access_key}")
-                with open("unsplash_keys_log.txt", "a") as log:
-                    log.write(f"{datetime.now()}: {app_name} -> {access_key}\n")
-                await asyncio.sleep(2)
-                await context.close()
-                return access_key
-            else:
-                await page.screenshot(path="reg_error_final.png")
-                print("未能解析 Access Key，已截图 reg_error_final.png")
-                await context.close()
-                return None
+                access_key = None
+        if not access_key:
+            try:
+                handle = await page.wait_for_function(_EXTRACT_KEY_JS, timeout=30000)
+                access_key = await handle.json_value()
+            except Exception:
+                _log.warning("未检测到标准 Access Key 元素，最后再尝试一次提取...")
+                try:
+                    access_key = await page.evaluate(_EXTRACT_KEY_JS)
+                except Exception:
+                    access_key = None
 
-        except Exception as e:
-            print(f"自动化注册流程失败: {e}")
-            await page.screenshot(path="process_exception.png")
-            await context.close()
+        if access_key:
+            # 结果行不走日志级别过滤：unsplash.py 以子进程运行本脚本并从 stdout 解析 Key
+            _print_result(f"应用注册成功！Key: {access_key}")
+            _log_key(f"{datetime.now()}: {app_name} -> {access_key}\n")
+            if save_state:
+                # 注册过程中服务端可能轮换了会话 cookie，写回去让下次运行直接用新的登录态
+                await _save_storage_state(page.context)
+            return access_key
+        else:
+            _log.warning("未能解析 Access Key")
+            await _dump_page(page, "reg_error_final")
             return None
 
+    except Exception as e:
+        _log.warning(f"自动化注册流程失败: {e}")
+        await _dump_page(page, "process_exception")
+        return None
+
+async def register_unsplash_app(app_name: str, headless: bool = False, login_timeout_s: int = 300) -> str | None:
+    """
+    Registers a new Unsplash app and returns the Access Key.
+
+    In headed mode a missing login is completed interactively; login_timeout_s (default 300s) bounds that wait.
+    """
+    # Playwright is heavy to import; only pay for it when a registration actually runs.
+    from playwright.async_api import async_playwright
+
+    async with async_playwright() as p:
+        await _migrate_legacy_profile(p)
+        # 优先连接常驻浏览器（PW_CDP_URL，如 http://127.0.0.1:9222），省去每次冷启动 Chromium 的开销
+        shared_context = False
+        context = None
+        cdp_url = (os.getenv("PW_CDP_URL") or "").strip()
+        if cdp_url:
+            try:
+                browser = await p.chromium.connect_over_cdp(cdp_url)
+                if browser.contexts:
+                    # 复用常驻浏览器的默认上下文（其 user-data-dir 保存了登录态），结束时只关闭自己的页面
+                    context = browser.contexts[0]
+                    shared_context = True
+                else:
+                    context = await _new_context(browser)
+            except Exception as e:
+                _log.warning(f"无法连接 PW_CDP_URL={cdp_url}: {e}. 回退为本地启动...")
+                context = None
+
+        if context is None:
+            # 登录态只保存为 storage_state JSON（几 KB），不再加载整个 Chromium profile
+            browser = await p.chromium.launch(headless=headless)
+            context = await _new_context(browser)
+
+        try:
+            return await _register_in_context(
+                context, app_name, headless, login_timeout_s, save_state=not shared_context
+            )
+        finally:
+            # 共享的常驻浏览器上下文不能关，否则会把别的任务/登录态一起关掉
+            if not shared_context:
+                try:
+                    await context.close()
+                except Exception:
+                    pass
+
+async def login_and_save(login_timeout_s: int = 300) -> bool:
+    """
+    Opens a headed browser for a one-time interactive login and saves the session as storage_state JSON.
+    """
+    from playwright.async_api import async_playwright
+
+    _setup_logging()
+    async with async_playwright() as p:
+        await _migrate_legacy_profile(p)
+        browser = await p.chromium.launch(headless=False)
+        try:
+            context = await _new_context(browser)
+            page = await context.new_page()
+            await page.goto("https://unsplash.com/oauth/applications", wait_until="commit", timeout=60000)
+            await _wait_ready(page)
+            state = await _probe_state(page)
+            if "login" in str(state.get("url") or page.url) or state.get("hasLoginLink"):
+                _log.warning("请在浏览器中完成登录并回到应用管理页面...")
+                await page.wait_for_url("**/oauth/applications", timeout=int(login_timeout_s) * 1000)
+            await _save_storage_state(context)
+            return True
+        except Exception as e:
+            _log.warning(f"登录失败: {e}")
+            return False
+        finally:
+            try:
+                await browser.close()
+            except Exception:
+                pass
+
+async def register_many(
+    names: list[str], concurrency: int = 5, headless: bool = True, login_timeout_s: int = 60
+) -> dict[str, str | None]:
+    """
+    Registers several apps concurrently over one browser (one context per app) and returns {name: key}.
+
+    Contexts are seeded from the saved storage state instead of a shared user-data-dir,
+    so they don't contend for the same Chromium profile. Headed batches only wait login_timeout_s
+    (default 60s) per app for a login; run --login first instead.
+    """
+    from playwright.async_api import async_playwright
+
+    _setup_logging()
+    names = [str(n) for n in (names or []) if str(n or "").strip()]
+    if not names:
+        return {}
+    sem = asyncio.Semaphore(max(1, int(concurrency)))
+
+    async with async_playwright() as p:
+        await _migrate_legacy_profile(p)
+        state_path = _storage_state_path()
+        if not os.path.isfile(state_path):
+            _log.warning(f"未找到登录态文件 {state_path}，请先运行: python scripts/register_unsplash_app.py --login")
+        browser = None
+        owns_browser = True
+        cdp_url = (os.getenv("PW_CDP_URL") or "").strip()
+        if cdp_url:
+            try:
+                browser = await p.chromium.connect_over_cdp(cdp_url)
+                owns_browser = False
+            except Exception as e:
+                _log.warning(f"无法连接 PW_CDP_URL={cdp_url}: {e}. 回退为本地启动...")
+                browser = None
+        if browser is None:
+            browser = await p.chromium.launch(headless=headless)
+
+        async def _one(name: str) -> str | None:
+            async with sem:
+                ctx = await _new_context(browser)
+                try:
+                    return await _register_in_context(ctx, name, headless, login_timeout_s)
+                finally:
+                    try:
+                        await ctx.close()
+                    except Exception:
+                        pass
+
+        try:
+            keys = await asyncio.gather(*(_one(n) for n in names), return_exceptions=True)
+        finally:
+            if owns_browser:
+                try:
+                    await browser.close()
+                except Exception:
+                    pass
+
+    return {n: (k if isinstance(k, str) else None) for n, k in zip(names, keys)}
+
+def main() -> None:
+    _setup_logging()
+    if len(sys.argv) > 1 and sys.argv[1] == "--login":
+        asyncio.run(login_and_save())
+    elif len(sys.argv) > 2:
+        asyncio.run(register_many(sys.argv[1:]))
+    else:
+        name = f"sharp-ply-share-{random.randint(100, 999)}"
+        if len(sys.argv) > 1:
+            name = sys.argv[1]
+        asyncio.run(register_unsplash_app(name))
+
 if __name__ == "__main__":
-    name = f"sharp-ply-share-{random.randint(100, 999)}"
-    if len(sys.argv) > 1:
-        name = sys.argv[1]
-    asyncio.run(register_unsplash_app(name))
+    main()
@@ -1,20 +1,37 @@
-from .hf_sync import (
-    configure_hf_sync,
-    hf_done_repo_path,
-    hf_file_exists_cached,
-    hf_locks_repo_path,
-    LockDoneSync,
-    RangeLockSync,
-)
-from .progress import OrderedProgress
-from .parquet_tools import (
-    duckdb_contains,
-    hub_list_parquet_urls,
-    probe_datasets_server,
-    viewer_filter,
-    viewer_filter_contains,
-    viewer_list_parquet_files,
-    viewer_rows,
-    viewer_search,
-    viewer_splits,
-)
+import importlib
+
+# Re-exports are resolved on first attribute access (PEP 562) so that importing a single
+# submodule doesn't drag in hf_sync / parquet_tools and their dependencies.
+_LAZY_EXPORTS = {
+    "configure_hf_sync": "hf_sync",
+    "hf_done_repo_path": "hf_sync",
+    "hf_file_exists_cached": "hf_sync",
+    "hf_locks_repo_path": "hf_sync",
+    "LockDoneSync": "hf_sync",
+    "RangeLockSync": "hf_sync",
+    "OrderedProgress": "progress",
+    "duckdb_contains": "parquet_tools",
+    "hub_list_parquet_urls": "parquet_tools",
+    "probe_datasets_server": "parquet_tools",
+    "viewer_filter": "parquet_tools",
+    "viewer_filter_contains": "parquet_tools",
+    "viewer_list_parquet_files": "parquet_tools",
+    "viewer_rows": "parquet_tools",
+    "viewer_search": "parquet_tools",
+    "viewer_splits": "parquet_tools",
+}
+
+__all__ = list(_LAZY_EXPORTS)
+
+
+def __getattr__(name):
+    mod_name = _LAZY_EXPORTS.get(name)
+    if mod_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{mod_name}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_EXPORTS))
@@ -1,31 +1,40 @@
 import os
+import re
 from datetime import datetime
 from . import hf_utils
 
+# Repo root (parent of this package). __file__ is already absolute for normal imports, so
+# abspath (and its getcwd) is only needed in the rare relative case.
+_REPO_ROOT = os.path.dirname(os.path.dirname(__file__ if os.path.isabs(__file__) else os.path.abspath(__file__)))
+
+# KEY=VALUE with an optional "export " prefix (key in group 1 after the prefix, else group 2; value
+# in group 3). Comment, blank and "="-less lines don't match, so one match() replaces the
+# strip/startswith/lower/split sequence per line.
+_DOTENV_LINE_RE = re.compile(
+    r"^\s*(?:(?i:export) \s*([^=\s][^=]*?)|(?!(?i:export) )([^=#\s][^=]*?))\s*=\s*(.*?)\s*$"
+)
+
+
 def load_dotenv_if_present() -> None:
-    try:
-        base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    except Exception:
-        base_dir = os.getcwd()
+    base_dir = _REPO_ROOT or os.getcwd()
 
     loaded_keys = set()
 
     def _apply_one(path: str, *, allow_override_loaded: bool) -> None:
+        if not path:
+            return
         try:
-            if not path or not os.path.isfile(path):
+            # 直接 open，缺文件时一次 ENOENT 即返回，不再先 stat 再 open
+            try:
+                f = open(path, "r", encoding="utf-8")
+            except (FileNotFoundError, IsADirectoryError, NotADirectoryError):
                 return
-            with open(path, "r", encoding="utf-8") as f:
+            with f:
                 for raw in f:
-                    line = raw.strip()
-                    if not line or line.startswith("#"):
-                        continue
-                    if line.lower().startswith("export "):
-                        line = line[7:].lstrip()
-                    if "=" not in line:
-                        continue
-                    k, v = map(str.strip, line.split("=", 1))
-                    if not k:
+                    m = _DOTENV_LINE_RE.match(raw)
+                    if m is None:
                         continue
+                    k, v = m.group(1) or m.group(2), m.group(3)
                     if k not in os.environ or (allow_override_loaded and k in loaded_keys):
                         if len(v) >= 2 and v[0] == v[-1] and v[0] in ("\"", "'"):
                             v = v[1:-1]
@@ -37,7 +46,7 @@ def load_dotenv_if_present() -> None:
     dirs = [base_dir]
     try:
         cwd = os.getcwd()
-        if cwd and os.path.abspath(cwd) != os.path.abspath(base_dir):
+        if cwd and os.path.normpath(cwd) != os.path.normpath(base_dir):
             dirs.append(cwd)
     except Exception:
         pass
@@ -56,7 +65,7 @@ _env_str = hf_utils.env_str
 # ===================== Configuration =====================
 UNSPLASH_ACCESS_KEY = os.getenv("UNSPLASH_ACCESS_KEY", "")
 APP_NAME = os.getenv("UNSPLASH_APP_NAME", "sharp-ply-share")
-OUTPUT_DIR = os.getenv("OUTPUT_DIR", os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+OUTPUT_DIR = os.getenv("OUTPUT_DIR", _REPO_ROOT)
 ML_SHARP_DIR = os.getenv("ML_SHARP_DIR", os.path.join(OUTPUT_DIR, "ml-sharp-main"))
 RUN_ID = os.getenv("RUN_ID", datetime.now().strftime("unsplash_%Y%m%d_%H%M%S"))
 SAVE_DIR = os.path.normpath(os.path.join(OUTPUT_DIR, "runs", RUN_ID))
@@ -1,15 +1,92 @@
 import base64
+import collections
+import contextlib
+import functools
 import json
+import mmap
 import os
 import random
+import re
 import subprocess
-import math
 import shutil
+import stat
+import threading
 import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
 
 from . import metrics
 from . import url_safety
 
+try:
+    import orjson
+except Exception:  # pragma: no cover
+    orjson = None
+
+try:
+    # SIMD 加速的 base64（可选依赖），接口与 base64.b64encode 一致，接受 memoryview
+    from pybase64 import b64encode as _b64encode
+except Exception:  # pragma: no cover
+    _b64encode = base64.b64encode
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def _get_session():
+    # 复用连接：一次上传的 initiate/chunk*N/finalize/createOrder 只需一次 TCP+TLS 握手
+    global _session
+    if _session is not None:
+        return _session
+    with _session_lock:
+        if _session is None:
+            import requests
+
+            sess = requests.Session()
+            try:
+                from requests.adapters import HTTPAdapter
+
+                # 重试由 trpc_post 自己负责，适配器不再叠加重试
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=0)
+                sess.mount("https://", adapter)
+                sess.mount("http://", adapter)
+            except Exception:  # pragma: no cover
+                pass
+            _session = sess
+    return _session
+
+
+def _json_dumps_bytes(obj) -> bytes:
+    # 请求体可能带几十 MB 的 base64 字符串：orjson 直接产出 bytes，省去 str -> bytes 再拷一遍
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj)
+        except Exception:
+            pass
+    return json.dumps(obj).encode("utf-8")
+
+
+def _stat_file(path: str) -> tuple[str, int] | None:
+    """Returns (absolute path, size) for a regular file with a single stat(), else None."""
+    try:
+        p = str(path)
+        p = os.path.normpath(p if os.path.isabs(p) else os.path.join(os.getcwd(), p))
+        st = os.stat(p)
+        if not stat.S_ISREG(st.st_mode):
+            return None
+        return p, int(st.st_size)
+    except OSError:
+        return None
+
+
+@functools.lru_cache(maxsize=16)
+def _resolve_bin(cand: str) -> str | None:
+    # which() 自己会 stat + 检查可执行（含带路径的 cand）；按进程缓存，批量生成时不再逐次遍历 PATH。
+    # 未找到时返回 None，由 subprocess 自己按 PATH 查找，所以缓存未命中结果也无妨。
+    return shutil.which(cand)
+
 
 def make_small_ply(
     ply_path: str,
@@ -19,9 +96,10 @@ def make_small_ply(
     debug_fn,
 ) -> str | None:
     try:
-        src = os.path.abspath(str(ply_path))
-        if not os.path.isfile(src):
+        got = _stat_file(ply_path)
+        if got is None:
             return None
+        src = got[0]
         try:
             low = os.path.basename(src).lower()
             if ".small.gsplat" in low:
@@ -32,26 +110,34 @@ def make_small_ply(
             pass
         base, _ = os.path.splitext(src)
         out = base + ".small.gsplat.ply"
-        if os.path.isfile(out) and os.path.getsize(out) > 0:
+        got = _stat_file(out)
+        if got is not None and got[1] > 0:
             return out
         cand = str(splat_transform_bin or "").strip() or "splat-transform"
-        resolved = cand
         try:
-            if (not os.path.isfile(resolved)) and shutil.which(resolved):
-                resolved = shutil.which(resolved) or resolved
+            resolved = _resolve_bin(cand) or cand
         except Exception:
             resolved = cand
 
         cmd = [
-            str(resolved),
+            resolved,
             "-w",
             src,
             "--filter-visibility",
             str(int(filter_visibility)),
             out,
         ]
-        subprocess.run(cmd, check=True)
-        if os.path.isfile(out) and os.path.getsize(out) > 0:
+        r = subprocess.run(cmd, check=False, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        if r.returncode != 0:
+            try:
+                if debug_fn:
+                    err = (r.stderr or b"").decode("utf-8", "replace").strip()
+                    debug_fn(f"GSPLAT: splat-transform 退出码 {r.returncode} | stderr={err[-400:]}")
+            except Exception:
+                pass
+            return None
+        got = _stat_file(out)
+        if got is not None and got[1] > 0:
             return out
         return None
     except Exception as e:
@@ -63,83 +149,182 @@ def make_small_ply(
         return None
 
 
-def _trpc_extract_data(resp: dict | list | None):
-    try:
-        if resp is None:
-            return None
-        if isinstance(resp, list) and resp:
-            item = (resp or [])[0] or {}
-            data = ((item.get("result") or {}) or {}).get("data")
-            if isinstance(data, dict) and "json" in data:
-                return data.get("json")
-            return data
-        if isinstance(resp, dict):
-            out = resp.get("result") or resp.get("data") or resp
-            if isinstance(out, dict) and "json" in out:
-                return out.get("json")
-            return out
-        return None
-    except Exception:
-        return None
+def _parse_trpc(resp: dict | list | None) -> tuple:
+    """Returns (data, error) of a tRPC response (batch list or single object); either may be None."""
+    # 每个 tRPC 响应都会经过这里：一次遍历同时取出 data 和 error，直接按类型分派，不靠异常兜底
+    if isinstance(resp, list):
+        item = resp[0] if resp else None
+        if not item or not isinstance(item, dict):
+            return None, None
+        err = item.get("error") or None
+        result = item.get("result")
+        if not result or not isinstance(result, dict):
+            return None, err
+        data = result.get("data")
+    elif isinstance(resp, dict):
+        err = resp.get("error") or None
+        data = resp.get("result") or resp.get("data") or resp
+    else:
+        return None, None
+    if isinstance(data, dict) and "json" in data:
+        data = data.get("json")
+    return data, err
 
 
-def _trpc_extract_error(resp: dict | list | None):
-    try:
-        if resp is None:
-            return None
-        if isinstance(resp, list) and resp:
-            item = (resp or [])[0] or {}
-            err = item.get("error")
-            if err:
-                return err
-            return None
-        if isinstance(resp, dict):
-            err = resp.get("error")
-            if err:
-                return err
-            return None
-        return None
-    except Exception:
-        return None
+_GSPLAT_FILE_TYPES = frozenset(("ply", "spz", "splat"))
 
 
 def _guess_gsplat_file_type(path: str) -> str:
-    try:
-        ext = os.path.splitext(str(path or "").strip())[-1].lower().lstrip(".")
-        if ext in ("ply", "spz", "splat"):
-            return ext
-        return "ply"
-    except Exception:
-        return "ply"
+    ext = path.rpartition(".")[2].lower()
+    return ext if ext in _GSPLAT_FILE_TYPES else "ply"
 
 
 def _deep_find_first(obj, keys: set[str], *, max_depth: int = 6):
+    # 显式栈的前序 DFS（子节点逆序入栈，保持与递归版相同的访问顺序），每个节点不再新建 Python 栈帧
     try:
-        if max_depth <= 0:
-            return None
-        if obj is None:
-            return None
-        if isinstance(obj, dict):
-            for k in keys:
-                v = obj.get(k)
-                if isinstance(v, str) and v.strip():
-                    return v
-            for v in obj.values():
-                got = _deep_find_first(v, keys, max_depth=max_depth - 1)
-                if got is not None:
-                    return got
-            return None
-        if isinstance(obj, list):
-            for it in obj:
-                got = _deep_find_first(it, keys, max_depth=max_depth - 1)
-                if got is not None:
-                    return got
-            return None
+        stack = [(obj, int(max_depth))]
+        while stack:
+            o, depth = stack.pop()
+            if depth <= 0 or o is None:
+                continue
+            if isinstance(o, dict):
+                for k in keys:
+                    v = o.get(k)
+                    if isinstance(v, str) and v.strip():
+                        return v
+                children = list(o.values())
+            elif isinstance(o, list):
+                children = o
+            else:
+                continue
+            depth -= 1
+            for child in reversed(children):
+                if isinstance(child, (dict, list)):
+                    stack.append((child, depth))
         return None
     except Exception:
         return None
 
 
+# 3 的倍数：分块编码后直接拼接与整体编码结果一致（中间块不会产生 '=' 填充）
+_B64_BLOCK = 768 * 1024
+
+
+def _b64_len(n: int) -> int:
+    return 4 * ((int(n) + 2) // 3)
+
+
+def _b64_into(f, length: int, out: bytearray, pos: int) -> tuple[int, int]:
+    """Base64-encodes up to ``length`` bytes of ``f`` into ``out`` at ``pos``.
+
+    ``f`` is a binary file or a memoryview (e.g. over an mmap). Returns (end position, bytes read);
+    the raw bytes are never copied out in full.
+    """
+    length = max(0, int(length))
+    if isinstance(f, memoryview):
+        nread = min(length, len(f))
+        for off in range(0, nread, _B64_BLOCK):
+            enc = _b64encode(f[off : min(nread, off + _B64_BLOCK)])
+            out[pos : pos + len(enc)] = enc
+            pos += len(enc)
+        return pos, nread
+    buf = bytearray(min(_B64_BLOCK, length) or 1)
+    mv = memoryview(buf)
+    nread = 0
+    while nread < length:
+        want = min(len(buf), length - nread)
+        got = 0
+        while got < want:
+            n = f.readinto(mv[got:want])
+            if not n:
+                break
+            got += n
+        if got <= 0:
+            break
+        enc = _b64encode(mv[:got])
+        out[pos : pos + len(enc)] = enc
+        pos += len(enc)
+        nread += got
+        if got < want:
+            break
+    return pos, nread
+
+
+# 占位符在 JSON 中原样输出（纯 ASCII、无需转义），据此把信封切成前后两段
+# 调用方在 payload 里用这个对象标记 base64 数据的位置；序列化前换成每次调用随机生成的哨兵字符串，
+# 这样文件名/标题里出现任何字面量都不会被误当成数据位置
+_B64_PLACEHOLDER = object()
+
+
+def _with_sentinel(obj, sentinel: str):
+    if obj is _B64_PLACEHOLDER:
+        return sentinel
+    if isinstance(obj, dict):
+        return {k: _with_sentinel(v, sentinel) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_with_sentinel(v, sentinel) for v in obj]
+    return obj
+
+
+def _b64_json_body(payload: dict, f, length: int) -> bytearray:
+    """Serializes ``payload`` with ``length`` bytes of ``f`` (file or memoryview) base64-encoded in place of ``_B64_PLACEHOLDER``.
+
+    base64 needs no JSON escaping, so the encoded data is written straight into the final body
+    instead of going through a str, the JSON encoder and a bytes copy.
+    """
+    sentinel = uuid.uuid4().hex
+    raw = _json_dumps_bytes(_with_sentinel(payload, sentinel))
+    marker = b'"' + sentinel.encode("ascii") + b'"'
+    if raw.count(marker) != 1:
+        raise ValueError("payload must contain exactly one base64 placeholder")
+    head, _, tail = raw.partition(marker)
+    length = int(length)
+    out = bytearray(len(head) + 2 + _b64_len(length) + len(tail))
+    out[: len(head)] = head
+    pos = len(head)
+    out[pos] = 0x22
+    pos, nread = _b64_into(f, length, out, pos + 1)
+    if nread != length:
+        raise OSError(f"short read: {nread}/{length} bytes")
+    out[pos] = 0x22
+    out[pos + 1 :] = tail
+    return out
+
+
+@contextlib.contextmanager
+def _open_for_b64(path: str):
+    """Yields a memoryview over a read-only mmap of ``path``, or the open file if mmap is unavailable.
+
+    Slices of the view are encoded straight from the page cache, skipping the read() copy into a
+    heap buffer; the sequential-access hint lets the kernel read ahead and drop consumed pages.
+    """
+    with open(path, "rb") as f:
+        mm = None
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            mm = None
+        if mm is None:
+            yield f
+            return
+        try:
+            if hasattr(mm, "madvise") and hasattr(mmap, "MADV_SEQUENTIAL"):
+                try:
+                    mm.madvise(mmap.MADV_SEQUENTIAL)
+                except Exception:
+                    pass
+            mv = memoryview(mm)
+            try:
+                yield mv
+            finally:
+                mv.release()
+        finally:
+            mm.close()
+
+
+_MAX_CHUNK_SIZE = 512 * 1024 * 1024
+
+
 def _chunked_upload_and_get_model_file_url(
     file_path: str,
     *,
@@ -148,22 +333,26 @@ def _chunked_upload_and_get_model_file_url(
     description: str,
     expiration_type: str,
     chunk_size: int = 50 * 1024 * 1024,
+    file_size: int | None = None,
     debug_fn,
 ) -> str | None:
     try:
-        src = os.path.abspath(str(file_path))
-        if not os.path.isfile(src):
-            return None
-        file_size = int(os.path.getsize(src))
+        src = str(file_path)
+        if file_size is None or not os.path.isabs(src):
+            got = _stat_file(src)
+            if got is None:
+                return None
+            src, file_size = got
+        file_size = int(file_size)
         if file_size <= 0:
             return None
 
-        start_ts = float(time.time())
+        start_ts = time.monotonic()
         try:
             total_timeout_s = float(str(os.getenv("GSPLAT_TOTAL_TIMEOUT_SECS", "3600") or "3600").strip())
         except Exception:
             total_timeout_s = 3600.0
-        total_timeout_s = max(30.0, float(total_timeout_s))
+        total_timeout_s = max(30.0, total_timeout_s)
 
         try:
             env_mb = str(os.getenv("GSPLAT_CHUNK_SIZE_MB", "") or "").strip()
@@ -174,22 +363,24 @@ def _chunked_upload_and_get_model_file_url(
         chunk_size = int(chunk_size)
         if chunk_size <= 0:
             chunk_size = 50 * 1024 * 1024
+        # chunkSize 在 initiate 时声明给服务端，上传中途不可调整；只限制上界（单块 JSON 约为 4/3 倍）
+        chunk_size = min(chunk_size, _MAX_CHUNK_SIZE)
 
-        total_chunks = int(math.ceil(float(file_size) / float(chunk_size)))
-        total_chunks = max(1, int(total_chunks))
-
+        # 以下变量在入口处一次性归一化类型，循环内直接使用
+        total_chunks = max(1, -(-file_size // chunk_size))
         filename = os.path.basename(src)
+        metadata = {
+            "title": str(title or ""),
+            "description": str(description or ""),
+            "expirationType": str(expiration_type or "1week"),
+        }
         initiate_payload = {
             "0": {
-                "filename": str(filename),
-                "fileSize": int(file_size),
-                "chunkSize": int(chunk_size),
+                "filename": filename,
+                "fileSize": file_size,
+                "chunkSize": chunk_size,
                 "contentType": "",
-                "metadata": {
-                    "title": str(title or ""),
-                    "description": str(description or ""),
-                    "expirationType": str(expiration_type or "1week"),
-                },
+                "metadata": metadata,
             }
         }
         init_resp = trpc_post(
@@ -201,7 +392,7 @@ def _chunked_upload_and_get_model_file_url(
         if not init_resp:
             return None
 
-        trpc_err = _trpc_extract_error(init_resp)
+        init_data, trpc_err = _parse_trpc(init_resp)
         if trpc_err is not None:
             try:
                 if debug_fn:
@@ -210,7 +401,6 @@ def _chunked_upload_and_get_model_file_url(
                 pass
             return None
 
-        init_data = _trpc_extract_data(init_resp)
         upload_id = None
         try:
             if isinstance(init_data, dict):
@@ -227,76 +417,105 @@ def _chunked_upload_and_get_model_file_url(
             except Exception:
                 pass
             return None
+        upload_id = str(upload_id)
 
-        # Send chunks as base64 strings in JSON (same as gsplat.org frontend).
-        with open(src, "rb") as f:
-            for chunk_index in range(int(total_chunks)):
-                try:
-                    if (float(time.time()) - float(start_ts)) > float(total_timeout_s):
-                        if debug_fn:
-                            debug_fn(
-                                f"GSPLAT: chunked upload total timeout（跳过） | s={int(time.time() - start_ts)} | limit_s={int(total_timeout_s)} | idx={chunk_index}/{total_chunks}"
-                            )
-                        return None
-                except Exception:
-                    pass
+        try:
+            inflight = int(str(os.getenv("GSPLAT_CHUNK_INFLIGHT", "1") or "1").strip())
+        except Exception:
+            inflight = 1
+        inflight = max(1, min(8, int(inflight)))
+
+        def _post_chunk(body):
+            t0 = time.monotonic()
+            resp = trpc_post(
+                gsplat_base,
+                "/share/trpc/order.chunkedUploadChunk?batch=1",
+                body,
+                debug_fn=debug_fn,
+            )
+            return resp, max(0.0, time.monotonic() - t0)
 
-                raw = f.read(int(chunk_size))
-                if not raw:
-                    break
-                enc0 = time.time()
-                data_b64 = base64.b64encode(raw).decode("ascii")
-                enc_s = max(0.0, float(time.time()) - float(enc0))
-                chunk_payload = {
-                    "0": {
-                        "uploadId": str(upload_id),
-                        "chunkIndex": int(chunk_index),
-                        "totalChunks": int(total_chunks),
-                        "data": data_b64,
-                        "size": int(len(raw)),
-                    }
-                }
-                t0 = time.time()
-                chunk_resp = trpc_post(
-                    gsplat_base,
-                    "/share/trpc/order.chunkedUploadChunk?batch=1",
-                    chunk_payload,
-                    debug_fn=debug_fn,
-                )
-                took_s = max(0.0, float(time.time()) - float(t0))
+        def _finish_chunk(chunk_index: int, raw_len: int, enc_s: float, fut) -> bool:
+            chunk_resp, took_s = fut.result()
+            try:
+                if debug_fn:
+                    mb = float(raw_len) / (1024.0 * 1024.0)
+                    spd = (mb / took_s) if took_s > 0 else 0.0
+                    debug_fn(
+                        f"GSPLAT: chunkedUploadChunk | idx={chunk_index + 1}/{total_chunks} | chunk_mb={mb:.2f} | enc_s={enc_s:.2f} | trpc_s={took_s:.2f} | mbps={spd:.2f}"
+                    )
+            except Exception:
+                pass
+            if not chunk_resp:
+                return False
+
+            _, trpc_err = _parse_trpc(chunk_resp)
+            if trpc_err is not None:
                 try:
                     if debug_fn:
-                        mb = float(len(raw)) / (1024.0 * 1024.0)
-                        spd = (mb / took_s) if took_s > 0 else 0.0
                         debug_fn(
-                            f"GSPLAT: chunkedUploadChunk | idx={chunk_index + 1}/{total_chunks} | chunk_mb={mb:.2f} | enc_s={enc_s:.2f} | trpc_s={took_s:.2f} | mbps={spd:.2f}"
+                            f"GSPLAT: chunkedUploadChunk 返回错误 | idx={chunk_index} | err={str(trpc_err)[:400]}"
                         )
                 except Exception:
                     pass
-                if not chunk_resp:
-                    return None
+                return False
+            return True
 
-                trpc_err = _trpc_extract_error(chunk_resp)
-                if trpc_err is not None:
-                    try:
-                        if debug_fn:
-                            debug_fn(
-                                f"GSPLAT: chunkedUploadChunk 返回错误 | idx={chunk_index} | err={str(trpc_err)[:400]}"
-                            )
-                    except Exception:
-                        pass
+        # Send chunks as base64 strings in JSON (same as gsplat.org frontend).
+        # 下一块的读盘+编码与在途的 POST 重叠；最多 inflight 个 POST 同时在途（默认 1，即仍按顺序逐块上传）。
+        pending = collections.deque()
+        ex = ThreadPoolExecutor(max_workers=inflight)
+        try:
+            with _open_for_b64(src) as f:
+                for chunk_index in range(total_chunks):
+                    enc0 = time.monotonic()
+                    if (enc0 - start_ts) > total_timeout_s:
+                        try:
+                            if debug_fn:
+                                debug_fn(
+                                    f"GSPLAT: chunked upload total timeout（跳过） | s={int(enc0 - start_ts)} | limit_s={int(total_timeout_s)} | idx={chunk_index}/{total_chunks}"
+                                )
+                        except Exception:
+                            pass
+                        return None
+
+                    off = chunk_index * chunk_size
+                    raw_len = min(chunk_size, file_size - off)
+                    if raw_len <= 0:
+                        break
+                    chunk_payload = _b64_json_body(
+                        {
+                            "0": {
+                                "uploadId": upload_id,
+                                "chunkIndex": chunk_index,
+                                "totalChunks": total_chunks,
+                                "data": _B64_PLACEHOLDER,
+                                "size": raw_len,
+                            }
+                        },
+                        f[off : off + raw_len] if isinstance(f, memoryview) else f,
+                        raw_len,
+                    )
+                    enc_s = max(0.0, time.monotonic() - enc0)
+
+                    while len(pending) >= inflight:
+                        if not _finish_chunk(*pending.popleft()):
+                            return None
+                    pending.append((chunk_index, raw_len, enc_s, ex.submit(_post_chunk, chunk_payload)))
+                    chunk_payload = None
+
+            while pending:
+                if not _finish_chunk(*pending.popleft()):
                     return None
+        finally:
+            ex.shutdown(wait=True, cancel_futures=True)
 
         finalize_payload = {
             "0": {
-                "uploadId": str(upload_id),
-                "totalChunks": int(total_chunks),
-                "filename": str(filename),
-                "metadata": {
-                    "title": str(title or ""),
-                    "description": str(description or ""),
-                    "expirationType": str(expiration_type or "1week"),
-                },
+                "uploadId": upload_id,
+                "totalChunks": total_chunks,
+                "filename": filename,
+                "metadata": metadata,
             }
         }
         fin_resp = trpc_post(
@@ -308,7 +527,7 @@ def _chunked_upload_and_get_model_file_url(
         if not fin_resp:
             return None
 
-        trpc_err = _trpc_extract_error(fin_resp)
+        fin_data, trpc_err = _parse_trpc(fin_resp)
         if trpc_err is not None:
             try:
                 if debug_fn:
@@ -317,7 +536,6 @@ def _chunked_upload_and_get_model_file_url(
                 pass
             return None
 
-        fin_data = _trpc_extract_data(fin_resp)
         model_file_url = None
         try:
             if isinstance(fin_data, str):
@@ -344,41 +562,95 @@ def _chunked_upload_and_get_model_file_url(
         return None
 
 
-def trpc_post(base_url: str, path: str, payload: dict, *, debug_fn) -> dict | None:
-    def _sleep_backoff(attempt: int, *, retry_after_s: float | None = None):
-        try:
-            if retry_after_s is not None:
-                wait_s = float(retry_after_s)
-            else:
-                wait_s = min(30.0, float(1.0 * (2**int(attempt))))
-                wait_s = float(wait_s) * (0.5 + random.random())
-            time.sleep(max(0.2, float(wait_s)))
-        except Exception:
-            time.sleep(0.5)
+_trpc_opts_cache = None
+
 
+def _trpc_opts() -> tuple:
+    """Returns (tries, requests timeout) from the GSPLAT_TRPC_* env, parsed once per process.
+
+    Parsed on first use rather than at import so values from .env (loaded by config) apply.
+    """
+    global _trpc_opts_cache
+    if _trpc_opts_cache is not None:
+        return _trpc_opts_cache
     try:
+        tries = int(os.getenv("GSPLAT_TRPC_RETRIES", "3") or "3")
+    except Exception:
         tries = 3
-        try:
-            tries = int(os.getenv("GSPLAT_TRPC_RETRIES", "3") or "3")
-        except Exception:
-            tries = 3
-        tries = max(1, min(10, int(tries)))
+    tries = max(1, min(10, int(tries)))
+    try:
+        connect_timeout = str(os.getenv("GSPLAT_TRPC_CONNECT_TIMEOUT_SECS", "") or "").strip()
+        read_timeout = str(os.getenv("GSPLAT_TRPC_TIMEOUT_SECS", "120") or "120").strip()
+        if connect_timeout:
+            req_timeout = (float(connect_timeout), float(read_timeout))
+        else:
+            req_timeout = float(read_timeout)
+    except Exception:
+        req_timeout = 120
+    _trpc_opts_cache = (tries, req_timeout)
+    return _trpc_opts_cache
 
-        import requests
 
-        try:
-            bu = url_safety.validate_external_url(str(base_url or "").strip())
-            host = ""
-            try:
-                from urllib.parse import urlparse
+# 指数退避基数（秒），上限 30s；实际等待再乘 [0.5, 1.5) 的抖动
+_BACKOFF_S = tuple(min(30.0, float(2**i)) for i in range(10))
 
-                host = (urlparse(bu).netloc or "").split("@")[-1].split(":", 1)[0].strip().lower()
-            except Exception:
-                host = ""
-            allow_any = str(os.getenv("GSPLAT_ALLOW_ANY_BASE", "0") or "0").strip().lower() in ("1", "true", "yes", "y")
-            if (not allow_any) and host and (host != "gsplat.org") and (not host.endswith(".gsplat.org")):
-                raise ValueError(f"disallowed GSPLAT_BASE host: {host}")
-            base_url = bu
+# 每个线程一个 Random 实例：并发上传重试时不争用全局 random 的锁
+_rng_local = threading.local()
+
+
+def _rng() -> random.Random:
+    r = getattr(_rng_local, "r", None)
+    if r is None:
+        r = _rng_local.r = random.Random()
+    return r
+
+
+def _sleep_backoff(attempt: int, *, retry_after_s: float | None = None) -> None:
+    if retry_after_s is not None:
+        wait_s = float(retry_after_s)
+    else:
+        wait_s = _BACKOFF_S[min(max(0, int(attempt)), len(_BACKOFF_S) - 1)] * (0.5 + _rng().random())
+    try:
+        time.sleep(max(0.2, wait_s))
+    except (OverflowError, ValueError):
+        # 例如 Retry-After: inf
+        time.sleep(0.5)
+
+
+# requests 只读取并合并这个 dict，不会修改它，可以在所有请求间共享
+_JSON_HEADERS = {"content-type": "application/json"}
+
+
+@functools.lru_cache(maxsize=8)
+def _base_url_host(url: str) -> str:
+    # 纯字符串解析，可以按 URL 缓存
+    try:
+        return (urlparse(url).netloc or "").split("@")[-1].split(":", 1)[0].strip().lower()
+    except Exception:
+        return ""
+
+
+def _check_base_url(base_url: str) -> str:
+    """Validates a gsplat base URL (public host; gsplat.org unless GSPLAT_ALLOW_ANY_BASE) and strips the trailing '/'. Raises ValueError.
+
+    Deliberately not cached: URL_VALIDATE_DNS resolution and the URL_ALLOW_PRIVATE / GSPLAT_ALLOW_ANY_BASE
+    policy must apply on every request.
+    """
+    bu = url_safety.validate_external_url(str(base_url or "").strip())
+    host = _base_url_host(bu)
+    allow_any = str(os.getenv("GSPLAT_ALLOW_ANY_BASE", "0") or "0").strip().lower() in ("1", "true", "yes", "y")
+    if (not allow_any) and host and (host != "gsplat.org") and (not host.endswith(".gsplat.org")):
+        raise ValueError(f"disallowed GSPLAT_BASE host: {host}")
+    return bu.rstrip("/")
+
+
+def trpc_post(base_url: str, path: str, payload: dict | bytes | bytearray, *, debug_fn) -> dict | None:
+    try:
+        tries, req_timeout = _trpc_opts()
+        session = _get_session()
+
+        try:
+            base_url = _check_base_url(str(base_url or "").strip())
         except Exception as e:
             try:
                 if debug_fn:
@@ -387,23 +659,16 @@ def trpc_post(base_url: str, path: str, payload: dict, *, debug_fn) -> dict | No
                 pass
             return None
 
-        url = f"{str(base_url).rstrip('/')}{path}"
-        try:
-            connect_timeout = str(os.getenv("GSPLAT_TRPC_CONNECT_TIMEOUT_SECS", "") or "").strip()
-            read_timeout = str(os.getenv("GSPLAT_TRPC_TIMEOUT_SECS", "120") or "120").strip()
-            if connect_timeout:
-                req_timeout = (float(connect_timeout), float(read_timeout))
-            else:
-                req_timeout = float(read_timeout)
-        except Exception:
-            req_timeout = 120
+        url = f"{base_url}{path}"
+        # 已序列化好的请求体（见 _b64_json_body）原样发送
+        body = payload if isinstance(payload, (bytes, bytearray)) else _json_dumps_bytes(payload)
         last_err = None
         for attempt in range(0, int(tries)):
             try:
-                r = requests.post(
+                r = session.post(
                     url,
-                    data=json.dumps(payload),
-                    headers={"content-type": "application/json"},
+                    data=body,
+                    headers=_JSON_HEADERS,
                     timeout=req_timeout,
                 )
                 if int(r.status_code) != 200:
@@ -467,6 +732,17 @@ def trpc_post(base_url: str, path: str, payload: dict, *, debug_fn) -> dict | No
         return None
 
 
+# createOrder 返回这些错误时视为暂时性错误，可重试（匹配前先转小写）
+_TRANSIENT_ERR_RE = re.compile(r"timeout|timed out|temporar|rate|too many|429|50[234]|gateway|service unavailable|network")
+
+
+def _is_transient_trpc_error(err_obj) -> bool:
+    try:
+        return _TRANSIENT_ERR_RE.search(str(err_obj or "").lower()) is not None
+    except Exception:
+        return False
+
+
 def upload_and_create_view(
     ply_path: str,
     *,
@@ -480,21 +756,27 @@ def upload_and_create_view(
     debug_fn,
 ) -> dict | None:
     try:
-        t0 = float(time.time())
-        src_ply = os.path.abspath(str(ply_path))
-        if not os.path.isfile(src_ply):
+        t0 = time.monotonic()
+        gsplat_base = str(gsplat_base or "").strip().rstrip("/")
+        title = str(title or "")
+        description = str(description or "")
+        expiration_type = str(expiration_type or "1week")
+        got = _stat_file(ply_path)
+        if got is None:
             return None
+        src_ply, sz = got
 
         upload_ply = src_ply
-        if bool(use_small_ply):
+        if use_small_ply:
             small_ply = make_small_ply(
                 src_ply,
                 splat_transform_bin=str(splat_transform_bin),
                 filter_visibility=int(filter_visibility),
                 debug_fn=debug_fn,
             )
-            if small_ply:
-                upload_ply = small_ply
+            got = _stat_file(small_ply) if small_ply else None
+            if got is not None:
+                upload_ply, sz = got
             else:
                 try:
                     if debug_fn:
@@ -503,46 +785,44 @@ def upload_and_create_view(
                     pass
 
         model_file_url = None
-        try:
-            sz = int(os.path.getsize(upload_ply))
-        except Exception:
-            sz = 0
 
         method = "direct"
 
         # If the payload is large, use chunked upload to avoid a huge single JSON request.
-        if int(sz) >= int(20 * 1024 * 1024):
+        if sz >= 20 * 1024 * 1024:
             method = "chunked"
             model_file_url = _chunked_upload_and_get_model_file_url(
                 upload_ply,
-                gsplat_base=str(gsplat_base),
-                title=str(title or ""),
-                description=str(description or ""),
-                expiration_type=str(expiration_type or "1week"),
+                gsplat_base=gsplat_base,
+                title=title,
+                description=description,
+                expiration_type=expiration_type,
+                file_size=sz,
                 debug_fn=debug_fn,
             )
         else:
-            with open(upload_ply, "rb") as f:
-                raw = f.read()
-            data_b64 = base64.b64encode(raw).decode("ascii")
-
             ftype = _guess_gsplat_file_type(upload_ply)
 
-            up_payload = {
-                "0": {
-                    "gaussianSplatFile": {
-                        "name": os.path.basename(upload_ply),
-                        "data": data_b64,
-                        "type": str(ftype),
-                        "size": int(len(raw)),
-                    }
-                }
-            }
+            with _open_for_b64(upload_ply) as f:
+                up_payload = _b64_json_body(
+                    {
+                        "0": {
+                            "gaussianSplatFile": {
+                                "name": os.path.basename(upload_ply),
+                                "data": _B64_PLACEHOLDER,
+                                "type": ftype,
+                                "size": sz,
+                            }
+                        }
+                    },
+                    f,
+                    sz,
+                )
             up_resp = trpc_post(gsplat_base, "/share/trpc/order.uploadGaussianSplat?batch=1", up_payload, debug_fn=debug_fn)
             if not up_resp:
                 return None
 
-            trpc_err = _trpc_extract_error(up_resp)
+            data, trpc_err = _parse_trpc(up_resp)
             if trpc_err is not None:
                 try:
                     if debug_fn:
@@ -552,7 +832,6 @@ def upload_and_create_view(
                 return None
 
             try:
-                data = _trpc_extract_data(up_resp)
                 if isinstance(data, str):
                     model_file_url = data
                 else:
@@ -571,38 +850,15 @@ def upload_and_create_view(
                     "gsplat_upload_total",
                     debug_fn=debug_fn,
                     ok=False,
-                    s=float(max(0.0, float(time.time()) - float(t0))),
-                    ply_bytes=int(sz),
-                    method=str(method),
+                    s=max(0.0, time.monotonic() - t0),
+                    ply_bytes=sz,
+                    method=method,
                     **metrics.snapshot(),
                 )
             except Exception:
                 pass
             return None
 
-        def _is_transient_trpc_error(err_obj) -> bool:
-            try:
-                s = str(err_obj or "").lower()
-                return any(
-                    x in s
-                    for x in (
-                        "timeout",
-                        "timed out",
-                        "temporar",
-                        "rate",
-                        "too many",
-                        "429",
-                        "502",
-                        "503",
-                        "504",
-                        "gateway",
-                        "service unavailable",
-                        "network",
-                    )
-                )
-            except Exception:
-                return False
-
         tries = 4
         try:
             tries = int(os.getenv("GSPLAT_CREATE_ORDER_RETRIES", "4") or "4")
@@ -613,15 +869,17 @@ def upload_and_create_view(
         share_id = None
         order_id = None
         last_resp = None
-        for attempt in range(0, int(tries)):
-            order_payload = {
+        order_payload = _json_dumps_bytes(
+            {
                 "0": {
                     "modelFileUrl": str(model_file_url),
-                    "title": str(title or ""),
-                    "description": str(description or ""),
-                    "expirationType": str(expiration_type or "1week"),
+                    "title": title,
+                    "description": description,
+                    "expirationType": expiration_type,
                 }
             }
+        )
+        for attempt in range(0, int(tries)):
             order_resp = trpc_post(gsplat_base, "/share/trpc/order.createOrder?batch=1", order_payload, debug_fn=debug_fn)
             last_resp = order_resp
             if not order_resp:
@@ -631,16 +889,11 @@ def upload_and_create_view(
                             debug_fn(f"GSPLAT: createOrder 请求失败，将重试 | attempt={attempt + 1}/{tries}")
                     except Exception:
                         pass
-                    try:
-                        wait_s = min(30.0, float(1.0 * (2**int(attempt))))
-                        wait_s = float(wait_s) * (0.5 + random.random())
-                        time.sleep(max(0.2, float(wait_s)))
-                    except Exception:
-                        time.sleep(0.5)
+                    _sleep_backoff(attempt)
                     continue
                 return None
 
-            trpc_err = _trpc_extract_error(order_resp)
+            data, trpc_err = _parse_trpc(order_resp)
             if trpc_err is not None:
                 try:
                     if debug_fn:
@@ -648,17 +901,11 @@ def upload_and_create_view(
                 except Exception:
                     pass
                 if attempt < (tries - 1) and _is_transient_trpc_error(trpc_err):
-                    try:
-                        wait_s = min(30.0, float(1.0 * (2**int(attempt))))
-                        wait_s = float(wait_s) * (0.5 + random.random())
-                        time.sleep(max(0.2, float(wait_s)))
-                    except Exception:
-                        time.sleep(0.5)
+                    _sleep_backoff(attempt)
                     continue
                 return None
 
             try:
-                data = _trpc_extract_data(order_resp)
                 if isinstance(data, dict):
                     share_id = data.get("shareId") or _deep_find_first(data, {"shareId"})
                     order_id = data.get("id") or _deep_find_first(data, {"id"})
@@ -676,12 +923,7 @@ def upload_and_create_view(
                         )
                 except Exception:
                     pass
-                try:
-                    wait_s = min(30.0, float(1.0 * (2**int(attempt))))
-                    wait_s = float(wait_s) * (0.5 + random.random())
-                    time.sleep(max(0.2, float(wait_s)))
-                except Exception:
-                    time.sleep(0.5)
+                _sleep_backoff(attempt)
                 continue
 
         if not share_id:
@@ -692,7 +934,7 @@ def upload_and_create_view(
                 pass
             return None
 
-        gsplat_url = f"{str(gsplat_base).rstrip('/')}/viewer/{share_id}"
+        gsplat_url = f"{gsplat_base}/viewer/{share_id}"
         out = {
             "gsplat_url": gsplat_url,
             "gsplat_share_id": str(share_id),
@@ -704,9 +946,9 @@ def upload_and_create_view(
                 "gsplat_upload_total",
                 debug_fn=debug_fn,
                 ok=True,
-                s=float(max(0.0, float(time.time()) - float(t0))),
-                ply_bytes=int(sz),
-                method=str(method),
+                s=max(0.0, time.monotonic() - t0),
+                ply_bytes=sz,
+                method=method,
                 **metrics.snapshot(),
             )
         except Exception:
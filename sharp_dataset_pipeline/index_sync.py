@@ -1,5 +1,8 @@
 import json
+import math
+import multiprocessing
 import os
+import re
 import shutil
 import threading
 import time
@@ -8,6 +11,174 @@ from typing import List, Dict, Optional, Any, Callable, Union, Set
 
 from . import hf_utils
 
+try:
+    import orjson
+except Exception:  # pragma: no cover
+    orjson = None
+
+_TOKEN_SPLIT_RE = re.compile(r"[\s,\u3001]+")
+
+_env_int = hf_utils.env_int
+
+# IndexSync fields read by _normalize_row; shipped to sanitize worker processes.
+_NORMALIZER_ATTRS = (
+    "repo_id",
+    "repo_type",
+    "compact",
+    "compact_drop_empty",
+    "asset_mode",
+    "text_mode",
+    "drop_derivable_urls",
+    "drop_user_name",
+    "drop_unsplash_id",
+)
+_SANITIZE_CHUNK_LINES = 4096
+_INDEX_IO_BUFFER = 4 * 1024 * 1024
+_SANITIZE_PARALLEL_MIN_BYTES = 32 * 1024 * 1024
+
+_worker_normalizer = None
+
+
+def _finite(obj):
+    # orjson writes NaN/Infinity as null; do the same on the stdlib path.
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {k: _finite(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_finite(v) for v in obj]
+    return obj
+
+
+def _json_dumps_bytes(obj) -> bytes:
+    # Every index writer (sanitize pass and add_row) goes through here so, for a given JSON backend,
+    # rows are byte-identical across code paths. The stdlib fallback matches orjson's separators and
+    # non-finite handling, but float exponents still differ (1e-07 vs 1e-7), so switching backends can
+    # make one sanitize pass report a change and re-upload the index once.
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj)
+        except Exception:
+            pass
+    try:
+        out = json.dumps(obj, ensure_ascii=False, separators=(",", ":"), allow_nan=False)
+    except ValueError:
+        out = json.dumps(_finite(obj), ensure_ascii=False, separators=(",", ":"))
+    return out.encode("utf-8")
+
+
+def _json_loads(s):
+    # orjson rejects NaN/Infinity, which json.loads accepts; fall back so such rows aren't dropped.
+    if orjson is not None:
+        try:
+            return orjson.loads(s)
+        except Exception:
+            pass
+    return json.loads(s)
+
+
+def _file_sig(path: str):
+    try:
+        st = os.stat(path)
+        return (int(st.st_size), int(st.st_mtime_ns))
+    except Exception:
+        return None
+
+
+def _sanitize_worker_init(state: dict):
+    global _worker_normalizer
+    n = IndexSync.__new__(IndexSync)
+    n.__dict__.update(state or {})
+    _worker_normalizer = n
+
+
+def _sanitize_worker_chunk(lines: list[bytes]) -> list:
+    loads = _json_loads
+    normalize = _worker_normalizer._normalize_row
+    out = []
+    for s in lines:
+        if not s:
+            out.append(None)
+            continue
+        try:
+            obj = loads(s)
+        except Exception:
+            out.append(None)
+            continue
+        norm = normalize(obj)
+        if not norm:
+            out.append(None)
+            continue
+        data = _json_dumps_bytes(norm)
+        out.append((str(norm.get("image_id") or ""), data, data != s))
+    return out
+
+
+def _try_to_repo_path(v: str) -> str:
+    try:
+        s = str(v or "").strip()
+        if not s:
+            return ""
+        if s.startswith("/") and ("/resolve/" not in s):
+            return s.lstrip("/")
+        if not (s.startswith("http://") or s.startswith("https://")):
+            return s.lstrip("/")
+        p = urlparse(s)
+        parts = [x for x in str(p.path or "").strip("/").split("/") if x]
+        if len(parts) >= 6 and parts[0] in ("datasets", "models") and parts[3] == "resolve":
+            return "/".join(parts[5:])
+        return s.lstrip("/")
+    except Exception:
+        try:
+            return str(v or "").strip().lstrip("/")
+        except Exception:
+            return ""
+
+
+def _tokenize_index_text(v):
+    try:
+        if v is None:
+            return []
+        if isinstance(v, list):
+            items = []
+            for it in v:
+                if it is None:
+                    continue
+                items.append(str(it))
+            s = " ".join(items)
+        else:
+            s = str(v)
+        parts = _TOKEN_SPLIT_RE.split(s)
+        outp = []
+        seen = set()
+        for p in parts:
+            t = str(p or "").strip()
+            if not t:
+                continue
+            key = t.lower()
+            if key in seen:
+                continue
+            seen.add(key)
+            outp.append(t)
+        return outp
+    except Exception:
+        return []
+
+
+def _dedupe_tokens(tokens):
+    res = []
+    seen = set()
+    for t in tokens:
+        tt = str(t or "").strip()
+        if not tt:
+            continue
+        key = tt.lower()
+        if key in seen:
+            continue
+        seen.add(key)
+        res.append(tt)
+    return res
+
 
 class IndexSync:
     def __init__(
@@ -122,15 +293,24 @@ class IndexSync:
         self.last_refresh_ts = 0.0
         self._refresh_inflight = False
         self._last_remote_local = ""
+        # (size, mtime_ns) of local_path when it was last known to be sanitized.
+        self._clean_sig = None
+        # path_in_repo -> (size, mtime_ns) of the local file as of its last upload.
+        self._uploaded_sigs: dict[str, tuple] = {}
+        self._api = None
 
         try:
             os.makedirs(self.save_dir, exist_ok=True)
         except Exception:
             pass
 
-        self._init_from_remote()
-        changed = self._sanitize_local_index()
-        self._load_indexed_ids()
+        remote_src = self._init_from_remote()
+        # False when the remote index was already normalized (byte-identical rows): no re-upload.
+        changed = self._sanitize_local_index(src_path=remote_src or None)
+        if remote_src and (not changed):
+            self._uploaded_sigs[self.repo_path] = self._local_index_sig()
+        if not self.indexed:
+            self._load_indexed_ids()
         self._load_manifest_index()
         try:
             if changed:
@@ -245,25 +425,9 @@ class IndexSync:
         out = dict(row)
         out["image_id"] = pid
 
-        def _try_to_repo_path(v: str) -> str:
-            try:
-                s = str(v or "").strip()
-                if not s:
-                    return ""
-                if s.startswith("/") and ("/resolve/" not in s):
-                    return s.lstrip("/")
-                if not (s.startswith("http://") or s.startswith("https://")):
-                    return s.lstrip("/")
-                p = urlparse(s)
-                parts = [x for x in str(p.path or "").strip("/").split("/") if x]
-                if len(parts) >= 6 and parts[0] in ("datasets", "models") and parts[3] == "resolve":
-                    return "/".join(parts[5:])
-                return s.lstrip("/")
-            except Exception:
-                try:
-                    return str(v or "").strip().lstrip("/")
-                except Exception:
-                    return ""
+        drop_derivable = bool(getattr(self, "drop_derivable_urls", False))
+        asset_mode = str(getattr(self, "asset_mode", "url"))
+        compact = bool(getattr(self, "compact", False))
 
         for k in ("image_url", "ply_url", "spz_url"):
             try:
@@ -281,7 +445,7 @@ class IndexSync:
             img = "" if img is None else str(img)
         except Exception:
             img = ""
-        if (not img) and (not bool(getattr(self, "drop_derivable_urls", False))):
+        if (not img) and (not drop_derivable):
             try:
                 ip = str(out.get("image_path") or "").strip().lstrip("/")
                 if ip:
@@ -293,7 +457,7 @@ class IndexSync:
         except Exception:
             out["image"] = ""
 
-        if bool(getattr(self, "drop_derivable_urls", False)):
+        if drop_derivable:
             try:
                 out.pop("image_url", None)
                 out.pop("ply_url", None)
@@ -301,7 +465,7 @@ class IndexSync:
             except Exception:
                 pass
 
-        if (not bool(getattr(self, "drop_derivable_urls", False))) and str(getattr(self, "asset_mode", "url")) in ("path", "both"):
+        if (not drop_derivable) and asset_mode in ("path", "both"):
             try:
                 imgp = _try_to_repo_path(out.get("image_url"))
                 plyp = _try_to_repo_path(out.get("ply_url"))
@@ -312,13 +476,13 @@ class IndexSync:
                     out["ply_path"] = plyp
                 if spzp:
                     out["spz_path"] = spzp
-                if str(getattr(self, "asset_mode", "url")) == "path":
+                if asset_mode == "path":
                     out.pop("image_url", None)
                     out.pop("ply_url", None)
                     out.pop("spz_url", None)
             except Exception:
                 pass
-        if bool(getattr(self, "drop_derivable_urls", False)) or str(getattr(self, "asset_mode", "url")) == "none":
+        if drop_derivable or asset_mode == "none":
             try:
                 out.pop("image_path", None)
                 out.pop("ply_path", None)
@@ -337,11 +501,11 @@ class IndexSync:
             "user_name",
         ):
             try:
-                if (not bool(getattr(self, "compact", False))) or (k in out):
+                if (not compact) or (k in out):
                     v = out.get(k)
                     out[k] = "" if v is None else str(v)
             except Exception:
-                if (not bool(getattr(self, "compact", False))) or (k in out):
+                if (not compact) or (k in out):
                     out[k] = ""
 
         try:
@@ -376,7 +540,7 @@ class IndexSync:
         except Exception:
             pass
 
-        if bool(getattr(self, "drop_derivable_urls", False)):
+        if drop_derivable:
             try:
                 out.pop("gsplat_url", None)
                 out.pop("unsplash_url", None)
@@ -395,66 +559,12 @@ class IndexSync:
             except Exception:
                 pass
 
-        def _tokenize(v):
-            try:
-                if v is None:
-                    return []
-                if isinstance(v, list):
-                    items = []
-                    for it in v:
-                        if it is None:
-                            continue
-                        items.append(str(it))
-                    s = " ".join(items)
-                else:
-                    s = str(v)
-                s = s.replace("\u3001", ",")
-                parts = []
-                cur = ""
-                for ch in s:
-                    if ch.isspace() or ch == ",":
-                        if cur:
-                            parts.append(cur)
-                            cur = ""
-                        continue
-                    cur += ch
-                if cur:
-                    parts.append(cur)
-                outp = []
-                seen = set()
-                for p in parts:
-                    t = str(p or "").strip()
-                    if not t:
-                        continue
-                    key = t.lower()
-                    if key in seen:
-                        continue
-                    seen.add(key)
-                    outp.append(t)
-                return outp
-            except Exception:
-                return []
-
-        tags_tokens = _tokenize(out.get("tags")) + _tokenize(out.get("tags_text"))
-        topics_tokens = _tokenize(out.get("topics")) + _tokenize(out.get("topics_text"))
+        tags_tokens = _tokenize_index_text(out.get("tags")) + _tokenize_index_text(out.get("tags_text"))
+        topics_tokens = _tokenize_index_text(out.get("topics")) + _tokenize_index_text(out.get("topics_text"))
 
         # Dedupe again after concatenation
-        def _dedupe(tokens):
-            res = []
-            seen = set()
-            for t in tokens:
-                tt = str(t or "").strip()
-                if not tt:
-                    continue
-                key = tt.lower()
-                if key in seen:
-                    continue
-                seen.add(key)
-                res.append(tt)
-            return res
-
-        tags_tokens = _dedupe(tags_tokens)
-        topics_tokens = _dedupe(topics_tokens)
+        tags_tokens = _dedupe_tokens(tags_tokens)
+        topics_tokens = _dedupe_tokens(topics_tokens)
 
         tags_text = " ".join(tags_tokens)
         topics_text = " ".join(topics_tokens)
@@ -515,7 +625,7 @@ class IndexSync:
             except Exception:
                 pass
 
-        if bool(getattr(self, "compact", False)) and bool(getattr(self, "compact_drop_empty", False)):
+        if compact and bool(getattr(self, "compact_drop_empty", False)):
             for k in (
                 "gsplat_url",
                 "gsplat_share_id",
@@ -539,38 +649,114 @@ class IndexSync:
         except Exception:
             return out
 
-    def _sanitize_local_index(self) -> bool:
+    def _normalizer_state(self) -> dict:
+        return {k: getattr(self, k, None) for k in _NORMALIZER_ATTRS}
+
+    def _iter_sanitized_rows(self, rf):
+        loads = _json_loads
+        dumps = _json_dumps_bytes
+        normalize = self._normalize_row
+        for line in rf:
+            s = line.strip()
+            if not s:
+                yield None
+                continue
+            try:
+                obj = loads(s)
+            except Exception:
+                yield None
+                continue
+            norm = normalize(obj)
+            if not norm:
+                yield None
+                continue
+            data = dumps(norm)
+            # Serialization is canonical, so an already-clean line round-trips to the same bytes.
+            yield (str(norm.get("image_id") or ""), data, data != s)
+
+    def _iter_sanitized_rows_parallel(self, rf, workers: int):
+        from collections import deque
+        from concurrent.futures import ProcessPoolExecutor
+
+        def _chunks():
+            chunk = []
+            for line in rf:
+                chunk.append(line.strip())
+                if len(chunk) >= _SANITIZE_CHUNK_LINES:
+                    yield chunk
+                    chunk = []
+            if chunk:
+                yield chunk
+
+        # spawn, not fork: this runs inside the threaded pipeline (with self.lock held), and a forked
+        # child could inherit another thread's lock in the held state and deadlock.
+        with ProcessPoolExecutor(
+            max_workers=int(workers),
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_sanitize_worker_init,
+            initargs=(self._normalizer_state(),),
+        ) as pool:
+            # Bounded submission window keeps memory O(workers * chunk) and results in input order.
+            inflight = deque()
+            for chunk in _chunks():
+                inflight.append(pool.submit(_sanitize_worker_chunk, chunk))
+                if len(inflight) >= int(workers) * 2:
+                    yield from inflight.popleft().result()
+            while inflight:
+                yield from inflight.popleft().result()
+
+    def _sanitize_local_index(self, src_path: Optional[str] = None) -> bool:
+        # src_path lets the initial pass read the freshly downloaded HF cache file
+        # directly, instead of copying it next to local_path first.
+        src = str(src_path or self.local_path)
         try:
-            if not os.path.exists(self.local_path):
+            if not os.path.exists(src):
                 return False
             tmp_path = self.local_path + ".tmp"
             seen = set()
+            # changed: the sanitized content differs from src. A different src is still copied
+            # to local_path, but an unchanged one doesn't need re-uploading.
             changed = False
-            with open(self.local_path, "r", encoding="utf-8") as rf, open(tmp_path, "w", encoding="utf-8") as wf:
-                for line in rf:
-                    s = line.strip()
-                    if not s:
-                        changed = True
-                        continue
-                    try:
-                        obj = json.loads(s)
-                    except Exception:
+            copy_src = src != self.local_path
+            seen_add = seen.add
+            buf: list[bytes] = []
+            buf_append = buf.append
+
+            workers = max(0, int(_env_int("HF_INDEX_SANITIZE_WORKERS", 0)))
+            if workers > 1 and hf_utils.file_size(src) < _SANITIZE_PARALLEL_MIN_BYTES:
+                workers = 0
+
+            with open(src, "rb", buffering=_INDEX_IO_BUFFER) as rf, open(tmp_path, "wb", buffering=_INDEX_IO_BUFFER) as wf:
+                if workers > 1:
+                    rows = self._iter_sanitized_rows_parallel(rf, workers)
+                else:
+                    rows = self._iter_sanitized_rows(rf)
+                for row in rows:
+                    if row is None:
                         changed = True
                         continue
-                    norm = self._normalize_row(obj)
-                    if not norm:
+                    pid, data, rewritten = row
+                    if not pid:
                         changed = True
                         continue
-                    pid = str(norm.get("image_id") or "")
-                    if not pid or pid in seen:
+                    # add + size check hashes the id once instead of `in` then add.
+                    n_seen = len(seen)
+                    seen_add(pid)
+                    if len(seen) == n_seen:
                         changed = True
                         continue
-                    seen.add(pid)
-                    wf.write(json.dumps(norm, ensure_ascii=False) + "\n")
-                    if norm is not obj:
+                    buf_append(data)
+                    buf_append(b"\n")
+                    if len(buf) >= 2000:
+                        wf.write(b"".join(buf))
+                        buf.clear()
+                    if rewritten:
                         changed = True
+                if buf:
+                    wf.write(b"".join(buf))
+            self.indexed.update(seen)
 
-            if changed:
+            if changed or copy_src:
                 try:
                     os.replace(tmp_path, self.local_path)
                 except Exception:
@@ -583,13 +769,22 @@ class IndexSync:
                     os.remove(tmp_path)
                 except Exception:
                     pass
+            self._clean_sig = self._local_index_sig()
             return bool(changed)
         except Exception:
+            if src != self.local_path:
+                try:
+                    shutil.copyfile(src, self.local_path)
+                except Exception:
+                    pass
             return False
 
-    def _init_from_remote(self):
+    def _local_index_sig(self):
+        return _file_sig(self.local_path)
+
+    def _init_from_remote(self) -> str:
         if (not self.repo_path) or (not self.repo_id):
-            return
+            return ""
         try:
             from huggingface_hub import hf_hub_download
 
@@ -602,28 +797,22 @@ class IndexSync:
                 self.last_refresh_ts = time.time()
             except Exception:
                 self.last_refresh_ts = 0.0
-            try:
-                shutil.copyfile(remote_local, self.local_path)
-            except Exception:
-                try:
-                    with open(remote_local, "rb") as rf, open(self.local_path, "wb") as wf:
-                        wf.write(rf.read())
-                except Exception:
-                    return
+            return str(remote_local or "")
         except Exception:
-            return
+            return ""
 
     def _iter_ids_from_jsonl(self, path: str):
         try:
             if not path or (not os.path.exists(path)):
                 return
-            with open(path, "r", encoding="utf-8") as f:
+            loads = _json_loads
+            with open(path, "rb", buffering=_INDEX_IO_BUFFER) as f:
                 for line in f:
                     s = line.strip()
                     if not s:
                         continue
                     try:
-                        obj = json.loads(s)
+                        obj = loads(s)
                         pid = str(obj.get("image_id") or "").strip()
                         if pid:
                             yield pid
@@ -741,9 +930,14 @@ class IndexSync:
                 # 检查目录是否存在
                 if not os.path.exists(os.path.dirname(self.local_path)):
                     os.makedirs(os.path.dirname(self.local_path), exist_ok=True)
-                    
-                with open(self.local_path, "a", encoding="utf-8") as f:
-                    f.write(json.dumps(norm, ensure_ascii=False) + "\n")
+
+                # Rows appended here are already normalized and deduped, so a clean
+                # file stays clean and the next flush can skip the sanitize pass.
+                was_clean = self._clean_sig is not None and self._local_index_sig() == self._clean_sig
+                with open(self.local_path, "ab") as f:
+                    f.write(_json_dumps_bytes(norm) + b"\n")
+                if was_clean:
+                    self._clean_sig = self._local_index_sig()
                 self.indexed.add(pid)
                 self.pending += 1
             except Exception as e:
@@ -770,14 +964,31 @@ class IndexSync:
 
                 from huggingface_hub import CommitOperationAdd, HfApi
 
-                api = HfApi()
-                self._sanitize_local_index()
-                ops = [CommitOperationAdd(path_in_repo=self.repo_path, path_or_fileobj=self.local_path)]
+                if self._api is None:
+                    self._api = HfApi()
+                api = self._api
+                if self._clean_sig is None or self._local_index_sig() != self._clean_sig:
+                    self._sanitize_local_index()
+                files = [(self.repo_path, self.local_path)]
                 try:
                     if bool(getattr(self, "write_manifest", True)) and self.manifest_repo_path and os.path.isfile(self.manifest_local_path):
-                        ops.append(CommitOperationAdd(path_in_repo=self.manifest_repo_path, path_or_fileobj=self.manifest_local_path))
+                        files.append((self.manifest_repo_path, self.manifest_local_path))
                 except Exception:
                     pass
+                sigs = {}
+                ops = []
+                for repo_file, local_file in files:
+                    sig = _file_sig(local_file)
+                    if sig is not None and sig == self._uploaded_sigs.get(repo_file):
+                        continue
+                    sigs[repo_file] = sig
+                    ops.append(CommitOperationAdd(path_in_repo=repo_file, path_or_fileobj=local_file))
+                if not ops:
+                    self._print("HF index 未变化，跳过上传")
+                    self.pending = 0
+                    self.manifest_pending = 0
+                    self.last_flush_ts = now
+                    return
                 try:
                     api.create_commit(
                         repo_id=self.repo_id,
@@ -796,6 +1007,7 @@ class IndexSync:
                         create_pr=True,
                     )
 
+                self._uploaded_sigs.update(sigs)
                 self.pending = 0
                 self.manifest_pending = 0
                 self.last_flush_ts = now
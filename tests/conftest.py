@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The pipeline is run from a checkout rather than installed; make the package importable under plain `pytest`.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
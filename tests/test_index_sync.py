@@ -0,0 +1,109 @@
+import json
+import shutil
+import sys
+import types
+
+import pytest
+
+from sharp_dataset_pipeline.index_sync import IndexSync
+
+REPO_PATH = "data/train.jsonl"
+
+
+class _FakeHub:
+    """In-memory stand-in for the huggingface_hub calls IndexSync makes."""
+
+    def __init__(self, remote_dir):
+        self.remote_dir = remote_dir
+        self.commits = []
+
+    def remote_file(self, filename):
+        return str(self.remote_dir / filename.replace("/", "__"))
+
+    def module(self):
+        hub = self
+
+        def hf_hub_download(repo_id, repo_type, filename):
+            path = hub.remote_file(filename)
+            with open(path, "rb"):
+                pass
+            return path
+
+        class CommitOperationAdd:
+            def __init__(self, path_in_repo, path_or_fileobj):
+                self.path_in_repo = path_in_repo
+                self.path_or_fileobj = path_or_fileobj
+
+        class HfApi:
+            def create_commit(self, repo_id, repo_type, operations, commit_message, create_pr=False):
+                hub.commits.append([op.path_in_repo for op in operations])
+                for op in operations:
+                    shutil.copyfile(op.path_or_fileobj, hub.remote_file(op.path_in_repo))
+
+        mod = types.ModuleType("huggingface_hub")
+        mod.hf_hub_download = hf_hub_download
+        mod.CommitOperationAdd = CommitOperationAdd
+        mod.HfApi = HfApi
+        return mod
+
+
+@pytest.fixture
+def hub(tmp_path, monkeypatch):
+    for name in (
+        "HF_INDEX_COMPACT",
+        "HF_INDEX_COMPACT_DROP_EMPTY",
+        "HF_INDEX_ASSET_MODE",
+        "HF_INDEX_TEXT_MODE",
+        "HF_INDEX_DROP_DERIVABLE_URLS",
+        "HF_INDEX_DROP_USER_NAME",
+        "HF_INDEX_DROP_UNSPLASH_ID",
+        "HF_INDEX_SANITIZE_WORKERS",
+    ):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv("HF_WRITE_MANIFEST", "0")
+    remote_dir = tmp_path / "remote"
+    remote_dir.mkdir()
+    fake = _FakeHub(remote_dir)
+    monkeypatch.setitem(sys.modules, "huggingface_hub", fake.module())
+    return fake
+
+
+def _index_sync(save_dir):
+    return IndexSync(
+        "user/dataset",
+        repo_type="dataset",
+        repo_path=REPO_PATH,
+        save_dir=str(save_dir),
+        hf_upload=True,
+        hf_index_flush_every=1,
+        hf_index_flush_secs=3600.0,
+    )
+
+
+def test_restart_after_appending_rows_does_not_reupload(hub, tmp_path):
+    # Remote index written by an older version with the stdlib json layout.
+    with open(hub.remote_file(REPO_PATH), "w", encoding="utf-8") as f:
+        f.write(json.dumps({"image_id": "seed", "description": "猫"}, ensure_ascii=False) + "\n")
+
+    work = tmp_path / "work"
+    first = _index_sync(work)
+    first.add_row({"image_id": "a1", "description": "cat", "tags": ["x", "y"]})
+    first.add_row({"image_id": "b2", "description": "dog"})
+    assert hub.commits, "appended rows should have been uploaded"
+
+    hub.commits.clear()
+    second = _index_sync(work)
+    assert hub.commits == []
+    assert {"seed", "a1", "b2"} <= second.indexed
+
+
+def test_appended_rows_match_sanitized_bytes(hub, tmp_path):
+    sync = _index_sync(tmp_path / "work")
+    sync.add_row({"image_id": "a1", "description": "猫 cat"})
+    sync.add_row({"image_id": "b2", "score": 1.5})
+    with open(sync.local_path, "rb") as f:
+        appended = f.read()
+
+    assert sync._sanitize_local_index() is False
+    with open(sync.local_path, "rb") as f:
+        assert f.read() == appended